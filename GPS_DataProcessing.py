@@ -81,7 +81,8 @@ def calculate_true_anomaly(E, e):
     return v
 
 # Corrected calculation function
-def calculate_satellite_position(satellite_data):
+# t is the evaluation time in seconds into the almanac's GPS week (defaults to 1 hour after t0)
+def calculate_satellite_position(satellite_data, t=None):
     # Extract parameters from satellite_data
     SQRT_A = satellite_data['SQRT(A)']
     M0 = satellite_data['Mean Anomaly']  # Mean Anomaly at reference time (in radians)
@@ -97,8 +98,9 @@ def calculate_satellite_position(satellite_data):
     omega_e = 7.2921151467e-5  # rad/s
 
     # Set current time t (e.g., 1 hour after t0)
-    t = t0 + 3600  # Time in seconds into GPS week
-    delta_t = t - t0  # delta_t = 3600 seconds
+    if t is None:
+        t = t0 + 3600  # Time in seconds into GPS week
+    delta_t = t - t0  # Time since reference epoch (seconds)
 
     # Calculations for semi-major axis, mean motion, and mean anomaly
     a = SQRT_A ** 2
@@ -120,8 +122,8 @@ def calculate_satellite_position(satellite_data):
     # Calculate radius
     r = a * (1 - e * math.cos(E))
 
-    # Corrected longitude of ascending node
-    Omega = Omega0 + (Omega_dot - omega_e) * delta_t
+    # Corrected longitude of ascending node (Omega0 is referenced to the start of the week)
+    Omega = Omega0 + (Omega_dot - omega_e) * delta_t - omega_e * t0
     Omega = Omega % (2 * math.pi)  # Normalize Omega
 
     # Compute ECEF coordinates using standard formulas
@@ -138,6 +140,54 @@ def calculate_satellite_position(satellite_data):
 
     return X, Y, Z
 
+# Broadcast ephemeris position (IS-GPS-200 / IS-QZSS-PNT user algorithm)
+# t is the evaluation time in seconds into the ephemeris' GPS week
+def calculate_ephemeris_position(ephemeris_data, t):
+    # Extract parameters from ephemeris_data
+    SQRT_A = ephemeris_data['SQRT(A)']
+    delta_n = ephemeris_data['Delta n']  # Mean motion correction (rad/s)
+    M0 = ephemeris_data['Mean Anomaly']  # Mean Anomaly at reference time (in radians)
+    e = ephemeris_data['Eccentricity']
+    Omega0 = ephemeris_data['Right Ascension at Week']  # Omega0 (in radians)
+    Omega_dot = ephemeris_data['Rate of Right Ascension']  # Rate of right ascension (rad/s)
+    toe = ephemeris_data['Time of Ephemeris']  # toe (seconds into GPS week)
+    i0 = ephemeris_data['Orbital Inclination']  # Inclination at toe (radians)
+    IDOT = ephemeris_data['Rate of Inclination']  # Rate of inclination (rad/s)
+    w = ephemeris_data['Argument of Perigee']  # Argument of perigee (radians)
+
+    delta_t = t - toe  # Time since ephemeris reference epoch
+
+    # Calculations for semi-major axis, corrected mean motion, and mean anomaly
+    a = SQRT_A ** 2
+    n = math.sqrt(mu / a ** 3) + delta_n
+    M = M0 + n * delta_t
+    M = M % (2 * math.pi)  # Normalize M
+
+    # Solve Kepler's equation and calculate true anomaly
+    E = calculate_eccentric_anomaly(M, e)
+    v = calculate_true_anomaly(E, e)
+
+    # Second harmonic perturbation corrections
+    phi = v + w
+    sin_2phi = math.sin(2 * phi)
+    cos_2phi = math.cos(2 * phi)
+    u = phi + ephemeris_data['Cus'] * sin_2phi + ephemeris_data['Cuc'] * cos_2phi
+    r = a * (1 - e * math.cos(E)) + ephemeris_data['Crs'] * sin_2phi + ephemeris_data['Crc'] * cos_2phi
+    i = i0 + IDOT * delta_t + ephemeris_data['Cis'] * sin_2phi + ephemeris_data['Cic'] * cos_2phi
+
+    # Corrected longitude of ascending node
+    Omega = Omega0 + (Omega_dot - omega_e) * delta_t - omega_e * toe
+    Omega = Omega % (2 * math.pi)  # Normalize Omega
+
+    # Position in orbital plane rotated into ECEF
+    x_orb = r * math.cos(u)
+    y_orb = r * math.sin(u)
+    X = x_orb * math.cos(Omega) - y_orb * math.cos(i) * math.sin(Omega)
+    Y = x_orb * math.sin(Omega) + y_orb * math.cos(i) * math.cos(Omega)
+    Z = y_orb * math.sin(i)
+
+    return X, Y, Z
+
 def calculate_long_latitude_altitude(X, Y, Z):
     # WGS-84 ellipsoid constants
     a = 6378137.0  # Semi-major axis in meters
@@ -168,15 +218,16 @@ def calculate_long_latitude_altitude(X, Y, Z):
     return longitude, latitude, altitude
 
 # Example usage
-file_path = 'GPS_DATA/current_yuma.alm'
-data = parse_almanac_file(file_path)
-
-for satellite in data:
-    try:
-        X, Y, Z = calculate_satellite_position(satellite)
-        longitude, latitude, altitude = calculate_long_latitude_altitude(X, Y, Z)
-        print(f"Satellite ID {satellite['ID']}:")
-        print(f"ECEF Coordinates: X = {X}, Y = {Y}, Z = {Z}")
-        print(f"Geodetic Coordinates: Longitude = {longitude}, Latitude = {latitude}, Altitude = {altitude}")
-    except Exception as e:
-        print(f"Error calculating position for satellite {satellite['ID']}: {e}")
+if __name__ == "__main__":
+    file_path = 'GPS_DATA/current_yuma.alm'
+    data = parse_almanac_file(file_path)
+
+    for satellite in data:
+        try:
+            X, Y, Z = calculate_satellite_position(satellite)
+            longitude, latitude, altitude = calculate_long_latitude_altitude(X, Y, Z)
+            print(f"Satellite ID {satellite['ID']}:")
+            print(f"ECEF Coordinates: X = {X}, Y = {Y}, Z = {Z}")
+            print(f"Geodetic Coordinates: Longitude = {longitude}, Latitude = {latitude}, Altitude = {altitude}")
+        except Exception as e:
+            print(f"Error calculating position for satellite {satellite['ID']}: {e}")
@@ -0,0 +1,319 @@
+import os
+import json
+import math
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from GPS_DataProcessing import calculate_satellite_position, calculate_ephemeris_position
+
+# Archive locations written by WebScraper.py
+ALMANAC_DIRECTORY = Path("site") / "public" / "sv_data" / "qzss_data"
+EPHEMERIS_DIRECTORY = Path("site") / "public" / "sv_data" / "qzss_ephemeris_data"
+
+SECONDS_PER_WEEK = 604800
+GPS_EPOCH_UNIX = 315964800  # 1980-01-06 00:00:00 UTC as a Unix timestamp
+GPS_LEAP_SECONDS = 18  # GPS - UTC offset since 2017
+
+# QZSS PRNs start at 193, the RINEX "J" satellite numbers start at 1
+QZSS_PRN_OFFSET = 192
+
+
+def unix_to_gps_seconds(unix_seconds):
+    return unix_seconds - GPS_EPOCH_UNIX + GPS_LEAP_SECONDS
+
+
+def load_almanacs(directory=ALMANAC_DIRECTORY):
+    """
+    Loads the archived QZSS almanac snapshots, keeping only the QZSS satellites.
+
+    The "week" stored by WebScraper.py is the scrape-time week modulo 1024, so the full
+    week of the time of applicability is recovered from the Unix timestamp in the file name.
+    Snapshots that repeat an already seen almanac are dropped, keeping the earliest retrieval.
+
+    :param directory: Directory holding the qzss_<epoch>.json files.
+    :return: List of almanac dictionaries sorted by retrieval time.
+    """
+    almanacs = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not (file_name.startswith("qzss_") and file_name.endswith(".json")):
+            continue
+        try:
+            retrieved = unix_to_gps_seconds(int(file_name[len("qzss_"):-len(".json")]))
+        except ValueError:
+            continue  # manifest.json or an unexpected file name
+
+        with open(Path(directory) / file_name, "r") as file:
+            snapshot = json.load(file)
+
+        satellites = {}
+        for satellite in snapshot["satellites"]:
+            prn = int(satellite["ID"])
+            if prn <= QZSS_PRN_OFFSET or "SQRT_A" not in satellite:
+                continue
+
+            # Pick the week that puts the time of applicability closest to the retrieval time
+            toa = satellite["TimeOfApplicability"]
+            week = int(retrieved // SECONDS_PER_WEEK)
+            week = min((week - 1, week, week + 1),
+                       key=lambda w: abs(w * SECONDS_PER_WEEK + toa - retrieved))
+
+            # Rename the archived keys to the ones used by GPS_DataProcessing
+            satellites[prn] = {
+                "ID": prn,
+                "SQRT(A)": satellite["SQRT_A"],
+                "Mean Anomaly": satellite["MeanAnom"],
+                "Eccentricity": satellite["Eccentricity"],
+                "Right Ascension at Week": satellite["RightAscenAtWeek"],
+                "Rate of Right Ascension": satellite["RateOfRightAscen"],
+                "Time of Applicability": toa,
+                "Orbital Inclination": satellite["OrbitalInclination"],
+                "Argument of Perigee": satellite["ArgumentOfPerigee"],
+                "week": week
+            }
+
+        if not satellites:
+            continue
+        key = tuple(sorted((prn, sat["week"], sat["Time of Applicability"]) for prn, sat in satellites.items()))
+        if key not in almanacs:
+            almanacs[key] = {"file_name": file_name, "retrieved": retrieved, "satellites": satellites}
+
+    return sorted(almanacs.values(), key=lambda almanac: almanac["retrieved"])
+
+
+def _rinex_values(line, first_column):
+    # RINEX 3 navigation data is written as fixed 19 character fields
+    values = []
+    for start in range(first_column, len(line.rstrip()), 19):
+        field = line[start:start + 19].strip()
+        values.append(float(field.replace("D", "E")) if field else 0.0)
+    return values
+
+
+def parse_rinex_ephemeris(content):
+    """
+    Parses the QZSS ("J") records of a RINEX 3 navigation file.
+
+    :param content: RINEX file contents as archived by WebScraper.py.
+    :return: List of ephemeris dictionaries using the GPS_DataProcessing key names.
+    """
+    lines = content.splitlines()
+    ephemerides = []
+
+    # Skip the header
+    index = 0
+    while index < len(lines) and "END OF HEADER" not in lines[index]:
+        index += 1
+    index += 1
+
+    while index + 7 < len(lines):
+        if not lines[index].startswith("J"):
+            index += 1
+            continue
+
+        try:
+            prn = int(lines[index][1:3]) + QZSS_PRN_OFFSET
+            orbit = []
+            for offset in range(1, 8):
+                orbit.extend(_rinex_values(lines[index + offset], 4))
+        except ValueError:
+            index += 1
+            continue
+
+        # Broadcast orbit fields in RINEX 3.02 order
+        ephemerides.append({
+            "ID": prn,
+            "Crs": orbit[1],
+            "Delta n": orbit[2],
+            "Mean Anomaly": orbit[3],
+            "Cuc": orbit[4],
+            "Eccentricity": orbit[5],
+            "Cus": orbit[6],
+            "SQRT(A)": orbit[7],
+            "Time of Ephemeris": orbit[8],
+            "Cic": orbit[9],
+            "Right Ascension at Week": orbit[10],
+            "Cis": orbit[11],
+            "Orbital Inclination": orbit[12],
+            "Crc": orbit[13],
+            "Argument of Perigee": orbit[14],
+            "Rate of Right Ascension": orbit[15],
+            "Rate of Inclination": orbit[16],
+            "week": int(orbit[18])
+        })
+        index += 8
+
+    return ephemerides
+
+
+def load_ephemerides(directory=EPHEMERIS_DIRECTORY):
+    """
+    Loads every archived QZSS broadcast ephemeris, removing records repeated across snapshots.
+
+    :param directory: Directory holding the qzss_ephemeris_<timestamp>.json files.
+    :return: List of ephemeris dictionaries sorted by reference time.
+    """
+    ephemerides = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not (file_name.startswith("qzss_ephemeris_") and file_name.endswith(".json")):
+            continue
+        with open(Path(directory) / file_name, "r") as file:
+            snapshot = json.load(file)
+
+        for ephemeris in parse_rinex_ephemeris(snapshot["content"]):
+            ephemeris["reference"] = ephemeris["week"] * SECONDS_PER_WEEK + ephemeris["Time of Ephemeris"]
+            ephemerides.setdefault((ephemeris["ID"], ephemeris["reference"]), ephemeris)
+
+    return sorted(ephemerides.values(), key=lambda ephemeris: ephemeris["reference"])
+
+
+def evaluate_almanac(task):
+    """
+    Propagates one almanac against every paired ephemeris record.
+
+    Each ephemeris record is evaluated over the half hour either side of its reference time,
+    which is the span over which the hourly QZSS ephemeris would be the one in use.
+
+    :param task: Tuple of (almanac, ephemerides, step_seconds, window_seconds).
+    :return: List of (prn, age_hours, error_m) samples.
+    """
+    almanac, ephemerides, step_seconds, window_seconds = task
+    samples = []
+
+    for ephemeris in ephemerides:
+        satellite = almanac["satellites"].get(ephemeris["ID"])
+        if satellite is None:
+            continue
+        almanac_week_start = satellite["week"] * SECONDS_PER_WEEK
+        ephemeris_week_start = ephemeris["week"] * SECONDS_PER_WEEK
+
+        t = ephemeris["reference"] - window_seconds
+        while t < ephemeris["reference"] + window_seconds:
+            # The almanac is only usable once it has been retrieved
+            if t >= almanac["retrieved"]:
+                X_alm, Y_alm, Z_alm = calculate_satellite_position(satellite, t - almanac_week_start)
+                X_eph, Y_eph, Z_eph = calculate_ephemeris_position(ephemeris, t - ephemeris_week_start)
+                error = math.sqrt((X_alm - X_eph) ** 2 + (Y_alm - Y_eph) ** 2 + (Z_alm - Z_eph) ** 2)
+                samples.append((ephemeris["ID"], (t - almanac["retrieved"]) / 3600, error))
+            t += step_seconds
+
+    return samples
+
+
+def summarize(errors):
+    errors = sorted(errors)
+    count = len(errors)
+    return {
+        "count": count,
+        "mean_m": sum(errors) / count,
+        "rms_m": math.sqrt(sum(error ** 2 for error in errors) / count),
+        "p95_m": errors[min(count - 1, math.ceil(0.95 * count) - 1)],
+        "max_m": errors[-1]
+    }
+
+
+def evaluate_archive(almanac_directory=ALMANAC_DIRECTORY, ephemeris_directory=EPHEMERIS_DIRECTORY,
+                     max_age_hours=168, bin_hours=12, step_seconds=300, workers=None):
+    """
+    Compares every archived almanac with the broadcast ephemerides that follow its retrieval.
+
+    :param max_age_hours: Oldest almanac age to evaluate (in hours).
+    :param bin_hours: Width of the almanac age bins (in hours).
+    :param step_seconds: Time between evaluated positions (in seconds).
+    :param workers: Number of worker processes (default: one per CPU).
+    :return: Dictionary with position error statistics per SV and per almanac age bin.
+    """
+    almanacs = load_almanacs(almanac_directory)
+    ephemerides = load_ephemerides(ephemeris_directory)
+    window_seconds = 1800
+
+    # Pair each almanac with the ephemeris records inside its age window
+    max_age_seconds = max_age_hours * 3600
+    tasks = []
+    for almanac in almanacs:
+        paired = [ephemeris for ephemeris in ephemerides
+                  if almanac["retrieved"] - window_seconds <= ephemeris["reference"] <= almanac["retrieved"] + max_age_seconds]
+        if paired:
+            tasks.append((almanac, paired, step_seconds, window_seconds))
+
+    per_sv = {}
+    per_age = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for samples in executor.map(evaluate_almanac, tasks):
+            for prn, age_hours, error in samples:
+                if age_hours > max_age_hours:
+                    continue
+                per_sv.setdefault(prn, []).append(error)
+                per_age.setdefault(int(age_hours // bin_hours) * bin_hours, []).append(error)
+
+    return {
+        "almanacs": len(almanacs),
+        "ephemerides": len(ephemerides),
+        "pairs": len(tasks),
+        "bin_hours": bin_hours,
+        "per_sv": {str(prn): summarize(errors) for prn, errors in sorted(per_sv.items())},
+        "per_age": {str(age): summarize(errors) for age, errors in sorted(per_age.items())}
+    }
+
+
+def recommend_refresh_interval(report, threshold_m):
+    """
+    Finds the longest almanac refresh interval whose 95th percentile error stays under the threshold.
+
+    :param report: Report returned by evaluate_archive.
+    :param threshold_m: Acceptable 95th percentile position error (in meters).
+    :return: Refresh interval in hours, or None if even the freshest almanacs exceed the threshold.
+    """
+    interval = None
+    for age, stats in sorted(report["per_age"].items(), key=lambda item: int(item[0])):
+        if stats["p95_m"] > threshold_m:
+            break
+        interval = int(age) + report["bin_hours"]
+    return interval
+
+
+def print_report(report):
+    print(f"Compared {report['almanacs']} almanacs against {report['ephemerides']} ephemeris records "
+          f"({report['pairs']} almanac pairings).")
+    header = f"{'count':>8} {'mean (m)':>12} {'rms (m)':>12} {'p95 (m)':>12} {'max (m)':>12}"
+
+    print(f"\nPosition error per SV:\n{'PRN':>10} {header}")
+    for prn, stats in report["per_sv"].items():
+        print(f"{prn:>10} {stats['count']:>8} {stats['mean_m']:>12.1f} {stats['rms_m']:>12.1f} "
+              f"{stats['p95_m']:>12.1f} {stats['max_m']:>12.1f}")
+
+    print(f"\nPosition error per almanac age:\n{'age (h)':>10} {header}")
+    for age, stats in report["per_age"].items():
+        age_range = f"{age}-{int(age) + report['bin_hours']}"
+        print(f"{age_range:>10} {stats['count']:>8} {stats['mean_m']:>12.1f} {stats['rms_m']:>12.1f} "
+              f"{stats['p95_m']:>12.1f} {stats['max_m']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate archived QZSS almanacs against broadcast ephemerides.")
+    parser.add_argument("--almanac-directory", type=Path, default=ALMANAC_DIRECTORY)
+    parser.add_argument("--ephemeris-directory", type=Path, default=EPHEMERIS_DIRECTORY)
+    parser.add_argument("--max-age-hours", type=int, default=168)
+    parser.add_argument("--bin-hours", type=int, default=12)
+    parser.add_argument("--step-seconds", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threshold-m", type=float, default=5000.0,
+                        help="Acceptable 95th percentile position error used for the refresh recommendation")
+    parser.add_argument("--output", type=Path, default=None, help="Optional path to save the report as JSON")
+    args = parser.parse_args()
+
+    report = evaluate_archive(args.almanac_directory, args.ephemeris_directory, args.max_age_hours,
+                              args.bin_hours, args.step_seconds, args.workers)
+    print_report(report)
+
+    interval = recommend_refresh_interval(report, args.threshold_m)
+    if interval is None:
+        print(f"\nNo almanac age keeps the 95th percentile error under {args.threshold_m:.0f} m.")
+    else:
+        print(f"\nRefreshing the QZSS almanac every {interval} hours keeps the 95th percentile error "
+              f"under {args.threshold_m:.0f} m (see interval_hours in WebScraper.py).")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"Saved report to {args.output}")